@@ -1,17 +1,19 @@
 #!/usr/bin/env python
 
+import os
 import pathlib
 import re
-import shlex
-import subprocess
-from typing import Any, Optional, TypedDict
+import sys
+from typing import Any, Callable, Optional, Sequence, TypedDict
 
 from subtitle_utils import (
     extract_sub_lang_by_track_collection_with_video_sub_info,
     get_video_by_ep_collection_with_glob_and_pattern,
     get_video_collection_with_glob,
     get_video_sub_info,
+    print_cmd,
     prompt_for_user_confirmation,
+    run_commands,
     simple_ep_pattern,
 )
 
@@ -21,6 +23,9 @@ class ExtractionMetadata(TypedDict, total=False):
     sub_lang_by_track_collection: dict[
         int, str
     ]  # Currently mandatory. Specified stream track should contain extractable subtitle stream. The string value (of the dict) will be used as extracted subtitle's language tag.
+    sub_format_by_track_collection: dict[
+        int, str
+    ]  # Optional. The string value (of the dict) will be used as extracted subtitle's file extension, e.g. "ass" or "srt". If not supplied, formats are detected from each video with ffprobe.
     target_video_glob: str  # Optional. If supplied, extracted subtitles will be renamed after another series of videos. If not supplied, origin_video_ep_pattern and target_video_ep_pattern will be ignored and extracted subtitles will be renamed after the original videos.
     origin_video_ep_pattern: str  # Optional. Only used when targeting another series of videos to identify the episode info from the original video. (Default: simple_ep_pattern)
     target_video_ep_pattern: str  # Optional. Only used when targeting another series of videos to identify the episode info from the targeting video. (Default: simple_ep_pattern)
@@ -29,66 +34,102 @@ class ExtractionMetadata(TypedDict, total=False):
 def extract_subtitles(
     origin_video_collection: tuple[pathlib.Path, ...],
     sub_lang_by_track_collection: Optional[dict[int, str]] = None,
+    sub_format_by_track_collection: Optional[dict[int, str]] = None,
     target_video_by_ep_collection: Optional[dict[str, pathlib.Path]] = None,
     origin_video_ep_pattern: re.Pattern[str] = simple_ep_pattern,
+    jobs: Optional[int] = None,
+    confirm: Callable[[str], bool] = prompt_for_user_confirmation,
+    log_cmd: Callable[[Sequence[str]], None] = print_cmd,
 ) -> None:
     """
     1. We first extract all the subtitle tracks from the origin video.
     2. We then use the sub_lang_by_track_collection to map each sub_track to a subtitle language,
     which we can use to name the subtitle file.
-    3. We then use the origin_video_collection to generate the command for each sub_track,
-    and then use shlex.join to join the cmd tuple to a string, then print it to the terminal.
+    Unless both sub_lang_by_track_collection and sub_format_by_track_collection are supplied,
+    the origin video is probed with ffprobe to detect the missing ones.
+    3. We then use the origin_video_collection to generate one command per video, which maps every sub_track
+    to its own output file, and then pass the cmd list to log_cmd, which by default prints it to the terminal.
     """
 
-    def _get_target_video() -> pathlib.Path:
-        if target_video_by_ep_collection:
-            m = origin_video_ep_pattern.match(origin_video.stem)
-            if m:
-                return target_video_by_ep_collection[m[1]]
-        return origin_video
-
     def _get_sub_format() -> str:
+        if sub_format_by_track_collection is not None:
+            return sub_format_by_track_collection[sub_index]
         codec_name = video_sub_info["streams"][sub_index]["codec_name"]
         return {"subrip": "srt", "ass": "ass"}[codec_name]
 
-    pending_subtitle_extraction: list[tuple[str, ...]] = []
+    pending_subtitle_extraction: list[list[str]] = []
     for origin_video in origin_video_collection:
-        video_sub_info = get_video_sub_info(origin_video)
+        video_sub_info = (
+            get_video_sub_info(origin_video)
+            if sub_lang_by_track_collection is None
+            or sub_format_by_track_collection is None
+            else None
+        )
         if sub_lang_by_track_collection is None:
             sub_lang_by_track_collection = (
                 extract_sub_lang_by_track_collection_with_video_sub_info(video_sub_info)
             )
+        # The episode match only depends on the origin video, so resolve the target video once per video.
+        target_video = (
+            target_video_by_ep_collection[m[1]]
+            if target_video_by_ep_collection
+            and (m := origin_video_ep_pattern.match(origin_video.stem))
+            else origin_video
+        )
+        # Only the suffix differs between the subtitles of a video, so build the rest of the path once.
+        sub_path_stem = str(target_video.with_suffix(""))
+        cmd = [
+            "ffmpeg",
+            "-loglevel",
+            "warning",
+            "-i",  # input
+            str(
+                origin_video
+            ),  # shlex.join only accept str, or we can use pathlike object directly here.
+            "-n",  # do not overwrite
+        ]
+        cmd_prefix_len = len(cmd)
+        # Extract all subtitle tracks in a single pass, so ffmpeg only reads the container once per video.
         for sub_index, sub_lang in sub_lang_by_track_collection.items():
-            sub_path = _get_target_video().with_suffix(
-                f".{sub_lang}.{_get_sub_format()}"
-            )
-            cmd = (
-                "ffmpeg",
-                "-loglevel",
-                "warning",
-                "-i",  # input
-                str(
-                    origin_video
-                ),  # shlex.join only accept str, or we can use pathlike object directly here.
-                "-n",  # do not overwrite
-                "-codec",
-                "copy",
-                "-map",
-                f"0:s:{sub_index}",  # copy this sub_track from the input file
-                str(sub_path),
+            if video_sub_info is not None and sub_index >= len(
+                video_sub_info["streams"]
+            ):
+                continue  # This video does not have the sub_track.
+            sub_path = f"{sub_path_stem}.{sub_lang}.{_get_sub_format()}"
+            # With -n one existing output makes ffmpeg exit without extracting the others, so skip it here.
+            if os.path.exists(sub_path):
+                continue
+            cmd.extend(
+                (
+                    "-map",
+                    f"0:s:{sub_index}?",  # copy this sub_track from the input file, if it exists
+                    "-codec",
+                    "copy",
+                    sub_path,
+                )
             )
-            print(shlex.join(cmd))
-            pending_subtitle_extraction.append(cmd)
-    if prompt_for_user_confirmation("Start subtitle extraction?"):
-        for cmd in pending_subtitle_extraction:
-            subprocess.run(cmd)
+        if len(cmd) == cmd_prefix_len:
+            continue  # Nothing left to extract from this video.
+        log_cmd(cmd)
+        pending_subtitle_extraction.append(cmd)
+    if confirm("Start subtitle extraction?"):
+        run_commands(pending_subtitle_extraction, jobs)
 
 
 def extract_fonts(
-    video_collection: tuple[pathlib.Path, ...], font_dir: Optional[pathlib.Path] = None
+    video_collection: tuple[pathlib.Path, ...],
+    font_dir: Optional[pathlib.Path] = None,
+    jobs: Optional[int] = None,
+    confirm: Callable[[str], bool] = prompt_for_user_confirmation,
+    log_cmd: Callable[[Sequence[str]], None] = print_cmd,
 ) -> None:
     if not video_collection:
         return
+    # Videos usually share a few directories, so resolve each directory only once.
+    resolved_dir_by_dir = {
+        video_dir: video_dir.resolve()
+        for video_dir in {video.parent for video in video_collection}
+    }
     pending_font_extraction: list[tuple[str, ...]] = []
     for video in video_collection:
         if font_dir is None:
@@ -101,19 +142,26 @@ def extract_fonts(
             "",  # with name guessed from attachments' filename field
             "-n",  # do not overwrite
             "-i",  # input file url follows
-            str(video.resolve()),
+            str(resolved_dir_by_dir[video.parent] / video.name),
         )
-        print(shlex.join(cmd))
+        log_cmd(cmd)
         pending_font_extraction.append(cmd)
     assert isinstance(font_dir, pathlib.Path)
-    if prompt_for_user_confirmation(f'Extract font to folder "{font_dir}?"'):
+    if confirm(f'Extract font to folder "{font_dir}?"'):
         if not font_dir.is_dir():
             font_dir.mkdir(
                 755, True, True
             )  # This might raise a FileExistsError by design.
             # User should then take care of the existing file and re-run the script.
-        for cmd in pending_font_extraction:
-            subprocess.run(cmd, cwd=font_dir)
+        # With no output file ffmpeg always exits with an error after dumping attachments, so its exit code means nothing.
+        run_commands(pending_font_extraction, jobs, font_dir, report_exit_code=False)
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)  # argparse reports this as an invalid positive_int value.
+    return number
 
 
 if __name__ == "__main__":
@@ -133,47 +181,95 @@ if __name__ == "__main__":
         type=pathlib.Path,
         help='The directory containing source videos and "subtitle-utils-patterns.json", also the place to put extracted subtitles. (Default: current working directory)',
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        help="The number of ffmpeg processes to run at the same time. (Default: half the number of CPUs)",
+    )
+    parser.add_argument(
+        "-y",
+        "--yes",
+        action="store_true",
+        help="Start extraction without asking for confirmation.",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Do not print the ffmpeg commands. (They are never printed when stdout is not a terminal.)",
+    )
     cli_args = parser.parse_args()
 
+    # Joining and quoting every command is wasted work when nobody is watching the terminal.
+    log_cmd: Callable[[Sequence[str]], None] = (
+        print_cmd
+        if not cli_args.quiet and sys.stdout.isatty()
+        else lambda cmd: None
+    )
+
+    def confirm(request_text: str) -> bool:
+        return cli_args.yes or prompt_for_user_confirmation(request_text)
+
     # Read metadata
     metadata: ExtractionMetadata = {
         "origin_video_glob": "*.mkv",
         "sub_lang_by_track_collection": {0: "eng", 1: "enm"},
+        # "sub_format_by_track_collection": {0: "ass", 1: "ass"},
         # "target_video_glob": "*.mp4",
         # "origin_video_ep_pattern": r".*\s(\d{2})\s.*",
         # "target_video_ep_pattern": r".*\s(\d{2})\s.*",
     }
 
     # Process
-    extraction_args: dict[str, Any] = {}
-    try:
-        origin_video_collection = get_video_collection_with_glob(
-            metadata["origin_video_glob"], cli_args.video_directory
-        )
+    # Scanning for origin and target videos are independent directory reads, so overlap them.
+    from concurrent.futures import ThreadPoolExecutor
+
+    extraction_args: dict[str, Any] = {
+        "jobs": cli_args.jobs,
+        "confirm": confirm,
+        "log_cmd": log_cmd,
+    }
+    with ThreadPoolExecutor(2) as executor:
+        try:
+            origin_video_collection_future = executor.submit(
+                get_video_collection_with_glob,
+                metadata["origin_video_glob"],
+                cli_args.video_directory,
+            )
+            extraction_args["sub_lang_by_track_collection"] = metadata[
+                "sub_lang_by_track_collection"
+            ]
+        except KeyError:
+            raise  # Explicitly catch and re-raise KeyError to comfort type checkers.
+        if "sub_format_by_track_collection" in metadata:
+            extraction_args["sub_format_by_track_collection"] = metadata[
+                "sub_format_by_track_collection"
+            ]
+        if "target_video_glob" in metadata:
+            target_video_ep_pattern = (
+                re.compile(metadata["target_video_ep_pattern"])
+                if "target_video_ep_pattern" in metadata
+                else simple_ep_pattern
+            )
+            target_video_by_ep_collection_future = executor.submit(
+                get_video_by_ep_collection_with_glob_and_pattern,
+                metadata["target_video_glob"],
+                target_video_ep_pattern,
+                cli_args.video_directory,
+            )
+            origin_video_ep_pattern = (
+                re.compile(metadata["origin_video_ep_pattern"])
+                if "origin_video_ep_pattern" in metadata
+                else simple_ep_pattern
+            )
+            extraction_args["origin_video_ep_pattern"] = origin_video_ep_pattern
+            extraction_args[
+                "target_video_by_ep_collection"
+            ] = target_video_by_ep_collection_future.result()
+        origin_video_collection = origin_video_collection_future.result()
         extraction_args["origin_video_collection"] = origin_video_collection
-        extraction_args["sub_lang_by_track_collection"] = metadata[
-            "sub_lang_by_track_collection"
-        ]
-    except KeyError:
-        raise  # Explicitly catch and re-raise KeyError to comfort type checkers.
-    if "target_video_glob" in metadata:
-        target_video_ep_pattern = (
-            re.compile(metadata["target_video_ep_pattern"])
-            if "target_video_ep_pattern" in metadata
-            else simple_ep_pattern
-        )
-        extraction_args[
-            "target_video_by_ep_collection"
-        ] = get_video_by_ep_collection_with_glob_and_pattern(
-            metadata["target_video_glob"],
-            target_video_ep_pattern,
-            cli_args.video_directory,
-        )
-        origin_video_ep_pattern = (
-            re.compile(metadata["origin_video_ep_pattern"])
-            if "origin_video_ep_pattern" in metadata
-            else simple_ep_pattern
-        )
-        extraction_args["origin_video_ep_pattern"] = origin_video_ep_pattern
     extract_subtitles(**extraction_args)
-    extract_fonts(origin_video_collection)
+    extract_fonts(
+        origin_video_collection, jobs=cli_args.jobs, confirm=confirm, log_cmd=log_cmd
+    )
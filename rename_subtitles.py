@@ -1,11 +1,13 @@
 #!/usr/bin/env python
 
+import os
 import pathlib
 import re
 from typing import List, Pattern, Tuple
 
 from subtitle_utils import (
     get_video_by_ep_collection_with_glob_and_pattern,
+    iglob_directory,
     print_video_by_ep_collection,
     prompt_for_user_confirmation,
     simple_ep_pattern,
@@ -29,9 +31,12 @@ def rename_subtitles(
     6. If user confirms, then rename all the subtitles.
     """
     pending_rename_operation_collection: List[Tuple[pathlib.Path, str]] = []
+    # Bind loop invariant lookups to locals, this loop may run over thousands of files.
+    sub_ep_match = sub_ep_pattern.match
+    append_rename_operation = pending_rename_operation_collection.append
     print("Subtitles matched; Subtitles new name:")
-    for sub_file in working_directory.glob(sub_glob):
-        m = sub_ep_pattern.match(sub_file.stem)
+    for sub_file in iglob_directory(sub_glob, working_directory):
+        m = sub_ep_match(sub_file.stem)
         if m and m[1] in video_stem_by_ep_collection:
             sub_new_suffix = (
                 f".{sub_lang}{sub_file.suffix}"
@@ -41,10 +46,11 @@ def rename_subtitles(
             video = video_stem_by_ep_collection[m[1]]
             sub_new_name = video.stem + sub_new_suffix
             print(sub_file.name, sub_new_name, sep=";\t")
-            pending_rename_operation_collection.append((sub_file, sub_new_name))
+            append_rename_operation((sub_file, sub_new_name))
     if prompt_for_user_confirmation("Apply renaming?"):
         for sub_file, sub_new_name in pending_rename_operation_collection:
-            sub_file.rename(sub_file.with_name(sub_new_name))
+            # Keep each subtitle in its own directory, sub_glob may reach into subdirectories.
+            os.rename(sub_file, os.path.join(os.path.dirname(sub_file), sub_new_name))
 
 
 if __name__ == "__main__":
@@ -1,11 +1,23 @@
 #!/usr/bin/env python
 
+import collections
+import fnmatch
+import functools
 import itertools
-import json
+import os
 import pathlib
+import queue
 import re
+import shlex
 import subprocess
-from typing import Any
+import threading
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+try:
+    # orjson parses ffprobe's JSON output (bytes) noticeably faster, use it when available.
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment]
 
 simple_ep_pattern = re.compile(r".*\s(\d{2})\s.*")
 
@@ -19,19 +31,50 @@ def print_video_by_ep_collection(
     )
 
 
+@functools.lru_cache
+def _compile_glob(glob: str) -> re.Pattern[str]:
+    # Match case the way pathlib does: insensitive on Windows only.
+    return re.compile(fnmatch.translate(glob), re.IGNORECASE if os.name == "nt" else 0)
+
+
+def iglob_directory(
+    glob: str, directory: pathlib.Path = pathlib.Path()
+) -> Iterator[pathlib.Path]:
+    """yield paths under the directory matching the glob, the same as pathlib.Path.glob"""
+    if "**" in glob or "/" in glob or os.sep in glob:
+        # Only globs matching names directly under the directory take the fast path below.
+        yield from directory.glob(glob)
+        return
+    # Matching names from os.scandir avoids creating a Path object for every entry like pathlib's glob does.
+    glob_match = _compile_glob(glob).match
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return  # pathlib's glob yields nothing for a missing, non-directory or unreadable path as well.
+    with entries:
+        for entry in entries:
+            if glob_match(entry.name):
+                yield pathlib.Path(entry.path)
+
+
+def print_cmd(cmd: Sequence[str]) -> None:
+    print(shlex.join(cmd))
+
+
 def get_video_collection_with_glob(
     video_glob: str, video_dir: pathlib.Path = pathlib.Path()
 ) -> tuple[pathlib.Path, ...]:
-    return tuple(video_dir.glob(video_glob))
+    return tuple(iglob_directory(video_glob, video_dir))
 
 
 def generate_video_by_ep_collection_with_pattern(
-    video_collection: tuple[pathlib.Path, ...],
+    video_collection: Iterable[pathlib.Path],
     video_ep_pattern: re.Pattern[str] = simple_ep_pattern,
 ) -> dict[str, pathlib.Path]:
     video_by_ep_collection: dict[str, pathlib.Path] = {}
+    video_ep_match = video_ep_pattern.match
     for video in video_collection:
-        m = video_ep_pattern.match(video.stem)
+        m = video_ep_match(video.stem)
         if m:
             video_by_ep_collection[m[1]] = video
     return video_by_ep_collection
@@ -42,9 +85,9 @@ def get_video_by_ep_collection_with_glob_and_pattern(
     video_ep_pattern: re.Pattern[str] = simple_ep_pattern,
     video_dir: pathlib.Path = pathlib.Path(),
 ) -> dict[str, pathlib.Path]:
-    video_collection = get_video_collection_with_glob(video_glob, video_dir)
+    # Feed the directory entries straight through, so they are globbed and matched in a single pass.
     return generate_video_by_ep_collection_with_pattern(
-        video_collection, video_ep_pattern
+        iglob_directory(video_glob, video_dir), video_ep_pattern
     )
 
 
@@ -53,6 +96,55 @@ def prompt_for_user_confirmation(request_text: str) -> bool:
     return user_input.lower() in ("", "y")
 
 
+def run_commands(
+    cmd_collection: Sequence[Sequence[str]],
+    jobs: Optional[int] = None,
+    cwd: Optional[pathlib.Path] = None,
+    report_exit_code: bool = True,
+) -> None:
+    """run commands concurrently, at most jobs at a time (Default: half the number of CPUs)"""
+    # Extraction is mostly disk bound, so leave room instead of starting a process per CPU.
+    if jobs is None:
+        jobs = (os.cpu_count() or 1) // 2
+    jobs = max(1, jobs)
+    pending_cmd_collection = collections.deque(cmd_collection)
+    running_cmd_by_process: dict[subprocess.Popen[bytes], Sequence[str]] = {}
+    finished_process_queue: queue.Queue[subprocess.Popen[bytes]] = queue.Queue()
+    finished_count = 0
+    while pending_cmd_collection or running_cmd_by_process:
+        # Start the next pending command as soon as a slot frees up.
+        while pending_cmd_collection and len(running_cmd_by_process) < jobs:
+            cmd = pending_cmd_collection.popleft()
+            # Detach stdin, or concurrent ffmpeg processes fight over the terminal's mode.
+            process = subprocess.Popen(cmd, cwd=cwd, stdin=subprocess.DEVNULL)
+            running_cmd_by_process[process] = cmd
+            # Wait for each process in its own thread, so only the processes started here are reaped.
+            threading.Thread(
+                target=_wait_for_process,
+                args=(process, finished_process_queue),
+                daemon=True,
+            ).start()
+        process = finished_process_queue.get()
+        cmd = running_cmd_by_process.pop(process)
+        finished_count += 1
+        # Name the input file so that a failure can be traced back to it.
+        cmd_input = (
+            cmd[cmd.index("-i") + 1] if "-i" in cmd[:-1] else shlex.join(cmd)
+        )
+        print(
+            f"[{finished_count}/{len(cmd_collection)}] finished {cmd_input}"
+            + (f" with exit code {process.returncode}" if report_exit_code else "")
+        )
+
+
+def _wait_for_process(
+    process: subprocess.Popen[bytes],
+    finished_process_queue: queue.Queue[subprocess.Popen[bytes]],
+) -> None:
+    process.wait()
+    finished_process_queue.put(process)
+
+
 def get_video_sub_info(video: pathlib.Path) -> Any:
     """extract all subtitle info from the video with ffprobe"""
     cmd = (
@@ -64,9 +156,11 @@ def get_video_sub_info(video: pathlib.Path) -> Any:
         "-show_streams",
         "-select_streams",
         "s",
+        "-threads",  # metadata-only query gains nothing from threading
+        "1",
         video,
     )
-    return json.loads(subprocess.run(cmd, capture_output=True).stdout)
+    return json_loads(subprocess.check_output(cmd))
 
 
 def extract_sub_lang_by_track_collection_with_video_sub_info(